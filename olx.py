@@ -1,17 +1,26 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
-import requests
+import gzip
+import hashlib
+import base64
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from bs4 import BeautifulSoup
 import re
+import math
 import csv
-from statistics import mean
+from bisect import bisect_left, bisect_right
 import webbrowser
 from openpyxl import Workbook
 import time
 import json
 import os
-from urllib.parse import quote
+import shutil
+import sqlite3
+import unicodedata
+from urllib.parse import quote, urlparse, parse_qs
+
+from rotas import PoolRotas, SemRotasDisponiveis, criar_rotas
 
 # Alertas (Windows)
 try:
@@ -26,11 +35,24 @@ HEADERS = {"User-Agent": "Mozilla/5.0"}
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FAV_FILE = os.path.join(BASE_DIR, "favorites.json")
 SEEN_FILE = os.path.join(BASE_DIR, "seen_links.json")
+CHECKPOINT_FILE = os.path.join(BASE_DIR, "scan_checkpoint.json")
+WATCHES_FILE = os.path.join(BASE_DIR, "watches.json")
+PROXIES_FILE = os.path.join(BASE_DIR, "proxies.json")
+INDEX_FILE = os.path.join(BASE_DIR, "listings.db")
+CHECKPOINT_MAX_AGE = 6 * 3600  # checkpoints mais antigos já não valem a pena retomar
+
+API_HOST = "127.0.0.1"
+API_PORT = int(os.environ.get("OLX_API_PORT", "8765"))
+API_PAGE_LIMIT = 200
 
-RESULT_COLS = ("Link", "Preço", "Negociável", "Novo", "Data", "Localização")
-FAV_COLS = ("Link", "Preço", "Negociável", "Data", "Localização")
+RESULT_COLS = ("Link", "Título", "Preço", "Negociável", "Novo", "Data", "Localização")
+FAV_COLS = ("Link", "Título", "Preço", "Negociável", "Data", "Localização")
 
 ALL_ANUNCIOS = []
+# (versão, query_key, anuncios, EstatisticasPrecos) publicado numa só atribuição
+# no fim de cada scan; a UI e a API lêem-no uma vez por uso. A versão invalida
+# os cursores antigos.
+RESULTS_SNAPSHOT = (0, "", [], None)
 LAST_QUERY_KEY = ""
 LAST_SEARCH_PARAMS = None
 
@@ -47,6 +69,15 @@ REFRESH_OPTIONS = {
     "60 min": 60
 }
 
+# Referência de preço para "Só abaixo da …" / "bom preço"
+REFERENCIAS = {
+    "Mediana": "mediana",
+    "Média": "media",
+    "Média aparada": "aparada",
+    "Média IQR": "iqr",
+}
+REF_DEFAULT = {"referencia": "mediana", "aparar": 0.1, "iqr_k": 1.5}
+
 SORT_RESULTS = {"col": None, "reverse": False}
 SORT_FAVS = {"col": None, "reverse": False}
 
@@ -55,21 +86,67 @@ SORT_FAVS = {"col": None, "reverse": False}
 # JSON
 # =========================
 
+def _ler_json(path, default):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # JSON válido mas com o tipo errado também conta como corrompido
+    if default is not None and not isinstance(data, type(default)):
+        raise ValueError(f"tipo inesperado em {path}")
+    return data
+
 def load_json(path, default):
+    # Ficheiro principal corrompido/truncado -> último snapshot bom (.bak)
+    for p in (path, path + ".bak"):
+        try:
+            if os.path.exists(p):
+                return _ler_json(p, default)
+        except Exception:
+            continue
+    return default
+
+def _fsync_dir(path):
+    # Garante que o rename fica no disco (não suportado em Windows)
     try:
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except Exception:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
         pass
-    return default
+    finally:
+        os.close(fd)
 
-def save_json(path, data):
+def save_json(path, data, silent=False):
+    # Escrita atómica: tmp + fsync + os.replace. O ficheiro anterior, se estiver
+    # bom, passa a ser o snapshot .bak usado pelo load_json em caso de corrupção.
+    tmp = path + ".tmp"
     try:
-        with open(path, "w", encoding="utf-8") as f:
+        with open(tmp, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if os.path.exists(path):
+            try:
+                _ler_json(path, None)
+                shutil.copyfile(path, tmp + ".bak")
+                os.replace(tmp + ".bak", path + ".bak")
+            except Exception:
+                pass  # actual corrompido: mantém o .bak anterior
+
+        os.replace(tmp, path)
+        _fsync_dir(path)
     except Exception as e:
-        messagebox.showerror(APP_TITLE, f"Erro a gravar ficheiro:\n{path}\n\n{e}")
+        if not silent:
+            messagebox.showerror(APP_TITLE, f"Erro a gravar ficheiro:\n{path}\n\n{e}")
+
+def remove_json(path):
+    for p in (path, path + ".bak", path + ".tmp"):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
 
 def load_favorites():
     return load_json(FAV_FILE, [])
@@ -83,6 +160,269 @@ def load_seen():
 def save_seen(seen_map):
     save_json(SEEN_FILE, seen_map)
 
+def load_watches():
+    return load_json(WATCHES_FILE, {})  # {query_key: {"referencia": ..., "aparar": ..., "iqr_k": ...}}
+
+def ref_valida(chave, valor):
+    # Mesmas regras para watches.json e para os parâmetros da API
+    if chave == "referencia":
+        return valor in REFERENCIAS.values()
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        return False
+    if chave == "aparar":
+        return 0 <= valor < 0.5
+    if chave == "iqr_k":
+        return valor > 0
+    return False
+
+def watch_config(qkey):
+    # Valores inválidos em watches.json caem para o REF_DEFAULT, chave a chave
+    guardado = load_watches().get(qkey, {})
+    if not isinstance(guardado, dict):
+        guardado = {}
+    return {k: guardado[k] if ref_valida(k, guardado.get(k)) else v for k, v in REF_DEFAULT.items()}
+
+def save_watch_config(qkey, **cfg):
+    watches = load_watches()
+    watches[qkey] = {**watches.get(qkey, {}), **cfg}
+    save_json(WATCHES_FILE, watches)
+
+def _checkpoint_valido(ckpt):
+    params = ckpt.get("params")
+    if not (isinstance(params, list) and len(params) == 5):
+        return False
+    produto, min_price, max_price, max_pages, _ = params
+    return (
+        isinstance(produto, str)
+        and all(isinstance(v, int) for v in (min_price, max_price, max_pages))
+        and isinstance(ckpt.get("last_page", 0), int)
+        and isinstance(ckpt.get("resultados", []), list)
+        and isinstance(ckpt.get("novos", []), list)
+    )
+
+def load_checkpoint():
+    ckpt = load_json(CHECKPOINT_FILE, {})
+    if not _checkpoint_valido(ckpt) or time.time() - ckpt.get("updated_at", 0) > CHECKPOINT_MAX_AGE:
+        return None
+    return ckpt
+
+def save_checkpoint(params, last_page, resultados, novos=None):
+    # novos: links já marcados como novos antes do save_seen (ver run_search)
+    ckpt = {
+        "params": list(params),  # [produto, min, max, max_pages, only_neg]
+        "last_page": last_page,
+        "resultados": resultados,
+        "updated_at": time.time()
+    }
+    if novos is not None:
+        ckpt["novos"] = novos
+    save_json(CHECKPOINT_FILE, ckpt, silent=True)
+
+def clear_checkpoint():
+    remove_json(CHECKPOINT_FILE)
+
+
+# =========================
+# ÍNDICE (SQLite FTS5)
+# =========================
+
+HAS_FTS5 = False
+FTS_TOKENIZE = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+# Ligação única partilhada pelas threads (UI, scan, API); usar sempre com DB_LOCK
+DB_LOCK = threading.RLock()
+_DB = None
+
+# Filtro "Texto": o MATCH corre sobre temp.actuais_fts, que só tem os anúncios
+# de _ACTUAIS["anuncios"]; os resultados ficam em cache por texto.
+_ACTUAIS = {"anuncios": None}
+_TEXTO_CACHE = {}
+TEXTO_CACHE_MAX = 64
+
+def _db():
+    global _DB
+    if _DB is None:
+        _DB = sqlite3.connect(INDEX_FILE, timeout=10, check_same_thread=False)
+        _DB.execute("PRAGMA journal_mode=WAL")
+    return _DB
+
+def init_index():
+    # Histórico de anúncios/preços + índice full-text (sem acentos) sobre título/descrição.
+    # Devolve False se o SQLite não tiver FTS5 (pesquisa cai para o modo em memória).
+    try:
+        with DB_LOCK, _db() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS anuncios (
+                    id INTEGER PRIMARY KEY, link TEXT NOT NULL UNIQUE, titulo TEXT, descricao TEXT,
+                    localizacao TEXT, preco_num INTEGER, query_key TEXT, visto_em TEXT
+                );
+                CREATE TABLE IF NOT EXISTS precos_hist (link TEXT, preco_num INTEGER, visto_em TEXT);
+                CREATE INDEX IF NOT EXISTS precos_hist_link ON precos_hist(link);
+                CREATE TRIGGER IF NOT EXISTS precos_hist_ai AFTER INSERT ON anuncios BEGIN
+                    INSERT INTO precos_hist VALUES (new.link, new.preco_num, new.visto_em);
+                END;
+                CREATE TRIGGER IF NOT EXISTS precos_hist_au AFTER UPDATE OF preco_num ON anuncios
+                WHEN old.preco_num IS NOT new.preco_num BEGIN
+                    INSERT INTO precos_hist VALUES (new.link, new.preco_num, new.visto_em);
+                END;
+            """)
+    except sqlite3.Error:
+        return False
+    try:
+        with DB_LOCK, _db() as conn:
+            conn.executescript(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS anuncios_fts USING fts5(
+                    titulo, descricao, content='anuncios', content_rowid='id', {FTS_TOKENIZE}
+                );
+                CREATE TRIGGER IF NOT EXISTS anuncios_ai AFTER INSERT ON anuncios BEGIN
+                    INSERT INTO anuncios_fts(rowid, titulo, descricao) VALUES (new.id, new.titulo, new.descricao);
+                END;
+                CREATE TRIGGER IF NOT EXISTS anuncios_ad AFTER DELETE ON anuncios BEGIN
+                    INSERT INTO anuncios_fts(anuncios_fts, rowid, titulo, descricao) VALUES ('delete', old.id, old.titulo, old.descricao);
+                END;
+                CREATE TRIGGER IF NOT EXISTS anuncios_au AFTER UPDATE ON anuncios BEGIN
+                    INSERT INTO anuncios_fts(anuncios_fts, rowid, titulo, descricao) VALUES ('delete', old.id, old.titulo, old.descricao);
+                    INSERT INTO anuncios_fts(rowid, titulo, descricao) VALUES (new.id, new.titulo, new.descricao);
+                END;
+                CREATE VIRTUAL TABLE IF NOT EXISTS temp.actuais_fts USING fts5(
+                    link UNINDEXED, titulo, descricao, {FTS_TOKENIZE}
+                );
+            """)
+        return True
+    except sqlite3.Error:
+        return False
+
+def indexar_anuncios(anuncios, qkey):
+    agora = time.strftime("%Y-%m-%d %H:%M:%S")
+    rows = [
+        (a["link"], a.get("titulo", ""), a.get("descricao", ""), a.get("localizacao", ""), a.get("preco_num"), qkey, agora)
+        for a in anuncios
+    ]
+    try:
+        with DB_LOCK, _db() as conn:
+            conn.executemany(
+                "INSERT INTO anuncios (link, titulo, descricao, localizacao, preco_num, query_key, visto_em)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(link) DO UPDATE SET"
+                "  titulo = excluded.titulo,"
+                "  descricao = CASE WHEN excluded.descricao != '' THEN excluded.descricao ELSE anuncios.descricao END,"
+                "  localizacao = excluded.localizacao, preco_num = excluded.preco_num,"
+                "  query_key = excluded.query_key, visto_em = excluded.visto_em",
+                rows
+            )
+    except sqlite3.Error:
+        pass
+
+def sem_acentos(texto):
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+def parse_pesquisa_texto(texto):
+    # "consola ps4* -avariado" -> incluir [("consola", False), ("ps4", True)], excluir [("avariado", False)]
+    incluir, excluir = [], []
+    for tok in (texto or "").split():
+        alvo = excluir if tok.startswith("-") else incluir
+        prefixo = tok.endswith("*")
+        termo = " ".join(re.findall(r"\w+", sem_acentos(tok)))
+        if termo:
+            alvo.append((termo, prefixo))
+    return incluir, excluir
+
+def _fts_termo(termo, prefixo):
+    return f'"{termo}"' + ("*" if prefixo else "")
+
+def _fts_expr(termos, juncao):
+    return f" {juncao} ".join(_fts_termo(*t) for t in termos)
+
+def _carregar_actuais(conn, anuncios):
+    # Recarrega temp.actuais_fts só quando muda a lista de anúncios actual
+    # (transacção própria: não fica aberta a segurar um snapshot WAL)
+    if _ACTUAIS["anuncios"] is anuncios:
+        return
+    _ACTUAIS["anuncios"] = None
+    with conn:
+        conn.execute("DELETE FROM temp.actuais_fts")
+        conn.executemany(
+            "INSERT INTO temp.actuais_fts (link, titulo, descricao) VALUES (?, ?, ?)",
+            ((a["link"], a.get("titulo", ""), a.get("descricao", "")) for a in anuncios)
+        )
+    _ACTUAIS["anuncios"] = anuncios
+    _TEXTO_CACHE.clear()
+
+def _fts_links(conn, expr):
+    cur = conn.execute("SELECT link FROM temp.actuais_fts WHERE actuais_fts MATCH ?", (expr,))
+    return {row[0] for row in cur}
+
+def _texto_corresponde(texto_norm, termo, prefixo):
+    padrao = r"\b" + re.escape(termo) + ("" if prefixo else r"\b")
+    return re.search(padrao, texto_norm) is not None
+
+def historico_precos(link):
+    try:
+        with DB_LOCK:
+            conn = _db()
+            cur = conn.execute(
+                "SELECT preco_num, visto_em FROM precos_hist WHERE link = ? ORDER BY visto_em", (link,)
+            )
+            return [{"preco_num": p, "visto_em": v} for p, v in cur]
+    except sqlite3.Error:
+        return []
+
+def pesquisar_historico(texto, limite=50):
+    # Pesquisa no histórico completo (anuncios_fts), mais recentes primeiro
+    incluir, excluir = parse_pesquisa_texto(texto)
+    if not incluir or not HAS_FTS5:
+        return []
+    expr = _fts_expr(incluir, "AND")
+    if excluir:
+        expr = f"({expr}) NOT ({_fts_expr(excluir, 'OR')})"
+    try:
+        with DB_LOCK:
+            cur = _db().execute(
+                "SELECT a.link, a.titulo, a.preco_num, a.localizacao, a.query_key, a.visto_em"
+                " FROM anuncios_fts JOIN anuncios a ON a.id = anuncios_fts.rowid"
+                " WHERE anuncios_fts MATCH ? ORDER BY anuncios_fts.rowid DESC LIMIT ?", (expr, limite)
+            )
+            cols = [d[0] for d in cur.description]
+            return [dict(zip(cols, row)) for row in cur]
+    except sqlite3.Error:
+        return []
+
+def resolver_pesquisa_texto(texto, anuncios=None):
+    # Devolve (links_incluidos | None, links_excluidos) ou None se não houver filtro.
+    # Só considera os `anuncios` dados: com FTS5 via temp.actuais_fts (em cache por
+    # texto, por isso mudar outros filtros não volta ao SQLite); sem FTS5, em memória.
+    incluir, excluir = parse_pesquisa_texto(texto)
+    if not incluir and not excluir:
+        return None
+    anuncios = anuncios if anuncios is not None else []
+
+    if HAS_FTS5:
+        chave = (tuple(incluir), tuple(excluir))
+        try:
+            with DB_LOCK:
+                conn = _db()
+                _carregar_actuais(conn, anuncios)
+                if chave not in _TEXTO_CACHE:
+                    if len(_TEXTO_CACHE) >= TEXTO_CACHE_MAX:
+                        _TEXTO_CACHE.clear()
+                    inc = _fts_links(conn, _fts_expr(incluir, "AND")) if incluir else None
+                    exc = _fts_links(conn, _fts_expr(excluir, "OR")) if excluir else set()
+                    _TEXTO_CACHE[chave] = (inc, exc)
+                return _TEXTO_CACHE[chave]
+        except sqlite3.Error:
+            pass
+
+    inc = set() if incluir else None
+    exc = set()
+    for a in anuncios:
+        norm = sem_acentos(f"{a.get('titulo', '')} {a.get('descricao', '')}")
+        if incluir and all(_texto_corresponde(norm, *t) for t in incluir):
+            inc.add(a["link"])
+        if any(_texto_corresponde(norm, *t) for t in excluir):
+            exc.add(a["link"])
+    return inc, exc
+
 
 # =========================
 # UTIL
@@ -132,8 +472,8 @@ def beep_alert():
 
 def ajustar_colunas(treeview):
     # Limites bons p/ não “rebentar” o layout
-    MIN_W = {"Preço": 92, "Negociável": 105, "Data": 160, "Localização": 220, "Link": 520, "Novo": 70}
-    MAX_W = {"Preço": 160, "Negociável": 150, "Data": 320, "Localização": 520, "Link": 860, "Novo": 90}
+    MIN_W = {"Preço": 92, "Negociável": 105, "Data": 160, "Localização": 220, "Link": 420, "Título": 240, "Novo": 70}
+    MAX_W = {"Preço": 160, "Negociável": 150, "Data": 320, "Localização": 520, "Link": 700, "Título": 480, "Novo": 90}
 
     for col in treeview["columns"]:
         max_len = max([len(str(treeview.set(k, col))) for k in treeview.get_children()] + [len(col)])
@@ -143,16 +483,32 @@ def ajustar_colunas(treeview):
         treeview.column(col, width=w)
 
 
+# =========================
+# ROTAS (proxies / user-agents)
+# =========================
+
+def carregar_rotas():
+    # proxies.json: [{"nome", "proxy", "user_agent", "rate", "burst"}, ...]
+    return criar_rotas(load_json(PROXIES_FILE, []), HEADERS)
+
+POOL = PoolRotas(carregar_rotas())
+
+
 # =========================
 # SCRAPE
 # =========================
 
-def pesquisar_olx(query, min_price=0, max_price=9999, max_paginas=10, only_negotiable=False, on_page_progress=None):
-    resultados = []
-    seen_links = set()
+def pesquisar_olx(query, min_price=0, max_price=9999, max_paginas=10, only_negotiable=False, on_page_progress=None,
+                  start_page=1, resultados=None, on_page_done=None, on_route_wait=None, on_interrupted=None):
+    # start_page/resultados permitem retomar a partir de um checkpoint;
+    # on_page_done(pagina, resultados) é chamado no fim de cada página.
+    # Se nenhuma rota responder, chama on_interrupted(erro) e devolve o que já
+    # foi recolhido (o checkpoint das páginas feitas fica para retomar).
+    resultados = list(resultados or [])
+    seen_links = {a["link"] for a in resultados}
     qslug = normalize_query_for_olx(query)
 
-    for pagina in range(1, max_paginas + 1):
+    for pagina in range(start_page, max_paginas + 1):
         if on_page_progress:
             on_page_progress(pagina)
 
@@ -161,9 +517,11 @@ def pesquisar_olx(query, min_price=0, max_price=9999, max_paginas=10, only_negot
             url += "&search[filter_float_negotiable]=1"
 
         try:
-            r = requests.get(url, headers=HEADERS, timeout=12)
-        except requests.RequestException:
-            continue
+            r = POOL.get(url, timeout=12, on_espera=on_route_wait)
+        except SemRotasDisponiveis as e:
+            if on_interrupted:
+                on_interrupted(e)
+            break
 
         if r.status_code != 200:
             break
@@ -180,6 +538,9 @@ def pesquisar_olx(query, min_price=0, max_price=9999, max_paginas=10, only_negot
                 continue
             seen_links.add(link)
 
+            titulo_tag = card.select_one("[data-cy='ad-card-title'] h4, [data-cy='ad-card-title'] h6, h4, h6")
+            titulo = titulo_tag.text.strip() if titulo_tag else a_tag.text.strip()
+
             preco_tag = card.select_one("p[data-testid='ad-price']")
             preco = preco_tag.text.strip() if preco_tag else ""
 
@@ -205,6 +566,7 @@ def pesquisar_olx(query, min_price=0, max_price=9999, max_paginas=10, only_negot
 
             resultados.append({
                 "link": link,
+                "titulo": titulo,
                 "preco": preco_limpo,
                 "preco_num": preco_num,
                 "negociavel": negociavel,
@@ -213,21 +575,156 @@ def pesquisar_olx(query, min_price=0, max_price=9999, max_paginas=10, only_negot
                 "localizacao": localizacao
             })
 
+        if on_page_done:
+            on_page_done(pagina, resultados)
+
     return resultados
 
 
+# =========================
+# ESTATÍSTICAS
+# =========================
+
+class EstatisticasPrecos:
+    """Estatísticas de preços sobre um array ordenado.
+
+    `adicionar` junta um lote (o timsort faz o merge das duas sequências já
+    ordenadas em tempo linear) e `ate` devolve o prefixo <= limiar sem reordenar,
+    por isso recalcular a cada mudança de filtro é barato mesmo com 100k anúncios.
+    """
+
+    def __init__(self, precos=()):
+        self._v = sorted(precos)
+        self._soma = sum(self._v)
+
+    def adicionar(self, precos):
+        lote = sorted(precos)
+        self._v.extend(lote)
+        self._v.sort()
+        self._soma += sum(lote)
+
+    def ate(self, limiar):
+        sub = EstatisticasPrecos()
+        sub._v = self._v[:bisect_right(self._v, limiar)]
+        sub._soma = sum(sub._v)
+        return sub
+
+    def __len__(self):
+        return len(self._v)
+
+    @property
+    def min(self):
+        return self._v[0] if self._v else None
+
+    @property
+    def max(self):
+        return self._v[-1] if self._v else None
+
+    @property
+    def media(self):
+        return self._soma / len(self._v) if self._v else None
+
+    @property
+    def mediana(self):
+        return self.percentil(50)
+
+    def percentil(self, p):
+        # Interpolação linear entre as posições vizinhas (como numpy "linear")
+        if not self._v:
+            return None
+        pos = (len(self._v) - 1) * p / 100
+        i = int(pos)
+        j = min(i + 1, len(self._v) - 1)
+        return self._v[i] + (self._v[j] - self._v[i]) * (pos - i)
+
+    def media_aparada(self, fracao=0.1):
+        # Corta pelo menos 1 de cada ponta quando fracao > 0, mesmo em conjuntos pequenos
+        n = len(self._v)
+        k = max(0, min(math.ceil(n * fracao), (n - 1) // 2)) if n else 0
+        v = self._v[k:n - k]
+        return sum(v) / len(v) if v else None
+
+    def media_iqr(self, k=1.5):
+        # Média sem outliers fora das barreiras de Tukey [Q1 - k·IQR, Q3 + k·IQR]
+        if not self._v:
+            return None
+        q1, q3 = self.percentil(25), self.percentil(75)
+        lo, hi = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+        v = self._v[bisect_left(self._v, lo):bisect_right(self._v, hi)]
+        return sum(v) / len(v) if v else self.media
+
+    def limiar(self, cfg=None):
+        cfg = {**REF_DEFAULT, **(cfg or {})}
+        ref = cfg["referencia"]
+        if ref == "media":
+            return self.media
+        if ref == "aparada":
+            return self.media_aparada(cfg["aparar"])
+        if ref == "iqr":
+            return self.media_iqr(cfg["iqr_k"])
+        return self.mediana
+
+    def resumo(self):
+        return {
+            "count": len(self._v),
+            "min": self.min,
+            "max": self.max,
+            "media": self.media,
+            "mediana": self.mediana,
+            "p25": self.percentil(25),
+            "p75": self.percentil(75),
+            "p90": self.percentil(90),
+        }
+
+
 # =========================
 # FILTROS
 # =========================
 
-def passa_filtros_base(a) -> bool:
-    if var_negociavel.get() and a.get("negociavel") != "Y":
+def filtros_base_actuais():
+    # Lido uma vez por aplicação de filtros, não por anúncio
+    return {
+        "negociavel": var_negociavel.get(),
+        "loc": entry_loc.get().strip().lower(),
+        "texto": resolver_pesquisa_texto(entry_texto.get(), ALL_ANUNCIOS),
+    }
+
+def passa_filtros_base(a, f) -> bool:
+    if f["negociavel"] and a.get("negociavel") != "Y":
         return False
-    termo_loc = entry_loc.get().strip().lower()
-    if termo_loc and termo_loc not in (a.get("localizacao") or "").lower():
+    if f["loc"] and f["loc"] not in (a.get("localizacao") or "").lower():
         return False
+    if f["texto"] is not None:
+        inc, exc = f["texto"]
+        if inc is not None and a["link"] not in inc:
+            return False
+        if a["link"] in exc:
+            return False
     return True
 
+def filtrar_anuncios(anuncios, f, abaixo_media=False, ref=None):
+    # Sem dependências de Tk: usado pela UI e pela API.
+    # Devolve (filtrados, estatísticas dos filtrados, limiar de referência).
+    # O limiar é calculado antes do corte "abaixo da referência".
+    # Sem filtros de base, reaproveita as estatísticas mantidas durante o scan.
+    _, _, snap_anuncios, snap_stats = RESULTS_SNAPSHOT
+    filtrados = [a for a in anuncios if passa_filtros_base(a, f)]
+    if snap_stats is not None and snap_anuncios is anuncios and not (f["negociavel"] or f["loc"] or f["texto"]):
+        stats = snap_stats
+    else:
+        stats = EstatisticasPrecos(a["preco_num"] for a in filtrados if a["preco_num"])
+    limiar = stats.limiar(ref)
+
+    if abaixo_media and limiar is not None:
+        filtrados = [a for a in filtrados if a["preco_num"] <= limiar]
+        stats = stats.ate(limiar)
+
+    return filtrados, stats, limiar
+
+def referencia_actual():
+    # Config da pesquisa cujos resultados estão na tabela (não da que está a correr)
+    return {**watch_config(RESULTS_SNAPSHOT[1]), "referencia": REFERENCIAS.get(var_referencia.get(), "mediana")}
+
 def aplicar_filtros():
     if not ALL_ANUNCIOS:
         for row in tree.get_children():
@@ -235,14 +732,8 @@ def aplicar_filtros():
         lbl_stats.config(text="")
         return [], None
 
-    filtrados = [a for a in ALL_ANUNCIOS if passa_filtros_base(a)]
-    precos = [a["preco_num"] for a in filtrados if a["preco_num"]]
-    preco_medio = mean(precos) if precos else None
-
-    if var_abaixo_media.get() and preco_medio is not None:
-        filtrados = [a for a in filtrados if a["preco_num"] <= preco_medio]
-        precos = [a["preco_num"] for a in filtrados if a["preco_num"]]
-        preco_medio = mean(precos) if precos else None
+    ref = referencia_actual()
+    filtrados, stats, limiar = filtrar_anuncios(ALL_ANUNCIOS, filtros_base_actuais(), var_abaixo_media.get(), ref)
 
     for row in tree.get_children():
         tree.delete(row)
@@ -251,39 +742,34 @@ def aplicar_filtros():
     for a in filtrados:
         row = tree.insert(
             "", tk.END,
-            values=(a["link"], a["preco"], a["negociavel"], a["novo"], a["data"], a["localizacao"])
+            values=(a["link"], a.get("titulo", ""), a["preco"], a["negociavel"], a["novo"], a["data"], a["localizacao"])
         )
         if a.get("novo") == "Y":
             tree.item(row, tags=("novo",))
             new_count += 1
-        if preco_medio is not None and a["preco_num"] <= preco_medio and a.get("novo") != "Y":
+        if limiar is not None and a["preco_num"] <= limiar and a.get("novo") != "Y":
             tree.item(row, tags=("bom_preco",))
 
-    if precos:
+    if len(stats):
         lbl_stats.config(
-            text=f"Min: {min(precos)}€  •  Max: {max(precos)}€  •  Média: {int(preco_medio)}€  •  "
-                 f"Anúncios: {len(filtrados)}  •  Novos: {new_count}"
+            text=f"Min: {stats.min}€  •  Max: {stats.max}€  •  Média: {int(stats.media)}€  •  "
+                 f"Mediana: {int(stats.mediana)}€  •  P25–P75: {int(stats.percentil(25))}–{int(stats.percentil(75))}€  •  "
+                 f"{var_referencia.get()}: {int(limiar)}€  •  Anúncios: {len(filtrados)}  •  Novos: {new_count}"
         )
     else:
         lbl_stats.config(text=f"Sem preços válidos  •  Anúncios: {len(filtrados)}  •  Novos: {new_count}")
 
     ajustar_colunas(tree)
     atualizar_setas_cabecalho_resultados()
-    return filtrados, preco_medio
-
-def contar_novos_dentro_do_filtro():
-    if not ALL_ANUNCIOS:
-        return 0
+    return filtrados, limiar
 
-    base = [a for a in ALL_ANUNCIOS if passa_filtros_base(a)]
-    precos = [a["preco_num"] for a in base if a["preco_num"]]
-    media = mean(precos) if precos else None
-
-    final = base
-    if var_abaixo_media.get() and media is not None:
-        final = [a for a in base if a["preco_num"] <= media]
-
-    return sum(1 for a in final if a.get("novo") == "Y")
+def contar_novos_dentro_do_filtro(filtrados=None):
+    # Recebe os filtrados de aplicar_filtros() para não repetir o trabalho
+    if filtrados is None:
+        if not ALL_ANUNCIOS:
+            return 0
+        filtrados, _, _ = filtrar_anuncios(ALL_ANUNCIOS, filtros_base_actuais(), var_abaixo_media.get(), referencia_actual())
+    return sum(1 for a in filtrados if a.get("novo") == "Y")
 
 
 # =========================
@@ -295,7 +781,7 @@ def refresh_favorites_tab():
     for row in fav_tree.get_children():
         fav_tree.delete(row)
     for f in favs:
-        fav_tree.insert("", tk.END, values=(f["link"], f["preco"], f["negociavel"], f["data"], f["localizacao"]))
+        fav_tree.insert("", tk.END, values=(f["link"], f.get("titulo", ""), f["preco"], f["negociavel"], f["data"], f["localizacao"]))
     ajustar_colunas(fav_tree)
     atualizar_setas_cabecalho_favs()
 
@@ -311,7 +797,7 @@ def add_selected_to_favorites():
         messagebox.showinfo(APP_TITLE, "Selecciona um anúncio na lista.")
         return
 
-    link, preco, negociavel, novo, data, localizacao = vals
+    link, titulo, preco, negociavel, novo, data, localizacao = vals
     favs = load_favorites()
 
     if any(f.get("link") == link for f in favs):
@@ -320,6 +806,7 @@ def add_selected_to_favorites():
 
     favs.append({
         "link": link,
+        "titulo": titulo,
         "preco": preco,
         "negociavel": negociavel,
         "data": data,
@@ -465,7 +952,7 @@ def set_controls_running(running: bool):
     cmb_refresh.config(state="disabled" if running else "readonly")
 
 def run_search(produto, min_price, max_price, max_pages, is_auto=False):
-    global LAST_QUERY_KEY, ALL_ANUNCIOS, LAST_SEARCH_PARAMS
+    global LAST_QUERY_KEY, ALL_ANUNCIOS, LAST_SEARCH_PARAMS, RESULTS_SNAPSHOT
 
     if not RUN_LOCK.acquire(blocking=False):
         set_status("⏳ Pesquisa em curso…")
@@ -474,48 +961,102 @@ def run_search(produto, min_price, max_price, max_pages, is_auto=False):
     start_time = time.perf_counter()
 
     def worker():
-        global LAST_QUERY_KEY, ALL_ANUNCIOS, LAST_SEARCH_PARAMS
+        global LAST_QUERY_KEY, ALL_ANUNCIOS, LAST_SEARCH_PARAMS, RESULTS_SNAPSHOT
         try:
             LAST_QUERY_KEY = query_key(produto, min_price, max_price)
             seen_map = load_seen()
             seen_set = set(seen_map.get(LAST_QUERY_KEY, []))
 
             only_neg = var_negociavel.get()
+            params = [produto, min_price, max_price, max_pages, only_neg]
+
+            # Retoma um scan interrompido com os mesmos parâmetros
+            start_page, parciais, novos_ckpt = 1, [], set()
+            ckpt = load_checkpoint()
+            if ckpt and ckpt["params"] == params:
+                start_page = ckpt.get("last_page", 0) + 1
+                parciais = ckpt.get("resultados", [])
+                novos_ckpt = set(ckpt.get("novos", []))
 
             def on_page(p):
                 root.after(0, lambda: (set_status(f"🔎 Página {p}/{max_pages}…"), set_progress(p)))
 
+            # Estatísticas mantidas à medida que chegam as páginas
+            stats_scan = EstatisticasPrecos(a["preco_num"] for a in parciais if a["preco_num"])
+            alimentados = len(parciais)
+            ultima_pagina = start_page - 1
+
+            def on_page_done(p, resultados):
+                nonlocal alimentados, ultima_pagina
+                ultima_pagina = p
+                save_checkpoint(params, p, resultados)
+                stats_scan.adicionar(a["preco_num"] for a in resultados[alimentados:] if a["preco_num"])
+                alimentados = len(resultados)
+
+            def on_route_wait(segundos):
+                root.after(0, lambda: set_status(f"⏳ A aguardar rota de saída ({segundos:.0f}s)…"))
+
+            interrompido = None
+
+            def on_interrupted(e):
+                nonlocal interrompido
+                interrompido = str(e)
+
             anuncios = pesquisar_olx(
                 produto, min_price, max_price, max_pages,
                 only_negotiable=only_neg,
-                on_page_progress=on_page
+                on_page_progress=on_page,
+                start_page=start_page,
+                resultados=parciais,
+                on_page_done=on_page_done,
+                on_route_wait=on_route_wait,
+                on_interrupted=on_interrupted
             )
 
             if not anuncios:
                 elapsed = time.perf_counter() - start_time
+                if interrompido:
+                    root.after(0, lambda: set_status(f"⛔ {interrompido} • {now_hhmmss()}"))
+                    return
+                clear_checkpoint()
                 root.after(0, lambda: set_status(f"⚠️ 0 anúncios ({elapsed:.1f}s)"))
                 return
 
             for a in anuncios:
-                a["novo"] = "Y" if a["link"] not in seen_set else "N"
+                a["novo"] = "Y" if a["link"] not in seen_set or a["link"] in novos_ckpt else "N"
+
+            # Os novos ficam no checkpoint antes do save_seen: se a app morrer entre
+            # os dois, ao retomar continuam a aparecer como novos.
+            ultima = ultima_pagina if interrompido else max_pages
+            save_checkpoint(params, ultima, anuncios, novos=[a["link"] for a in anuncios if a["novo"] == "Y"])
 
             seen_map[LAST_QUERY_KEY] = list(seen_set.union({a["link"] for a in anuncios}))
             save_seen(seen_map)
+            if interrompido:
+                save_checkpoint(params, ultima, anuncios)  # fica só para as páginas em falta
+            else:
+                clear_checkpoint()
+            indexar_anuncios(anuncios, LAST_QUERY_KEY)
 
             ALL_ANUNCIOS = anuncios
+            RESULTS_SNAPSHOT = (RESULTS_SNAPSHOT[0] + 1, LAST_QUERY_KEY, anuncios, stats_scan)
             LAST_SEARCH_PARAMS = (produto, min_price, max_price, max_pages)
 
             elapsed = time.perf_counter() - start_time
 
             def update_ui():
-                aplicar_filtros()
+                carregar_referencia_watch()
+                filtrados, _ = aplicar_filtros()
                 refresh_favorites_tab()
-                novos_no_filtro = contar_novos_dentro_do_filtro()
+                novos_no_filtro = contar_novos_dentro_do_filtro(filtrados)
+                fim = f"{elapsed:.1f}s • {now_hhmmss()}"
+                if interrompido:
+                    fim = f"parcial, guardada para retomar ({interrompido}) • {fim}"
                 if novos_no_filtro > 0:
                     beep_alert()
-                    set_status(f"✅ {novos_no_filtro} novo(s) no filtro • {elapsed:.1f}s • {now_hhmmss()}")
+                    set_status(f"✅ {novos_no_filtro} novo(s) no filtro • {fim}")
                 else:
-                    set_status(f"✅ Sem novos no filtro • {elapsed:.1f}s • {now_hhmmss()}")
+                    set_status(f"✅ Sem novos no filtro • {fim}")
 
             root.after(0, update_ui)
 
@@ -548,10 +1089,37 @@ def buscar():
         return
     run_search(produto, min_price, max_price, max_pages, is_auto=False)
 
+def oferecer_retomar_scan():
+    ckpt = load_checkpoint()
+    if not ckpt:
+        return
+    produto, min_price, max_price, max_pages, only_neg = ckpt["params"]
+    msg = (f"Há uma pesquisa interrompida:\n\n“{produto}” ({min_price}–{max_price}€), "
+           f"página {ckpt.get('last_page', 0)}/{max_pages}.\n\nRetomar?")
+    if not messagebox.askyesno(APP_TITLE, msg):
+        clear_checkpoint()
+        return
+    for entry, val in ((entry_produto, produto), (entry_min, min_price), (entry_max, max_price), (entry_paginas, max_pages)):
+        entry.delete(0, tk.END)
+        entry.insert(0, str(val))
+    var_negociavel.set(only_neg)
+    run_search(produto, min_price, max_price, max_pages, is_auto=False)
+
 def on_filters_changed(*_):
     if ALL_ANUNCIOS:
         aplicar_filtros()
 
+def carregar_referencia_watch():
+    ref = watch_config(RESULTS_SNAPSHOT[1])["referencia"]
+    nomes = {v: k for k, v in REFERENCIAS.items()}
+    var_referencia.set(nomes.get(ref, "Mediana"))
+
+def on_referencia_changed(event=None):
+    qkey = RESULTS_SNAPSHOT[1]  # a pesquisa mostrada, não a que pode estar a correr
+    if qkey:
+        save_watch_config(qkey, referencia=REFERENCIAS.get(var_referencia.get(), "mediana"))
+    on_filters_changed()
+
 
 # =========================
 # EXPORT
@@ -563,7 +1131,7 @@ def exportar_csv():
         return
     with open(path, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f, delimiter=";")
-        writer.writerow(["Link", "Preço", "Negociável", "Novo", "Data", "Localização"])
+        writer.writerow(list(RESULT_COLS))
         for item in tree.get_children():
             writer.writerow(tree.item(item)["values"])
     messagebox.showinfo(APP_TITLE, "CSV exportado ✅")
@@ -575,7 +1143,7 @@ def exportar_xlsx():
     wb = Workbook()
     ws = wb.active
     ws.title = APP_TITLE
-    ws.append(["Link", "Preço", "Negociável", "Novo", "Data", "Localização"])
+    ws.append(list(RESULT_COLS))
     for item in tree.get_children():
         ws.append(tree.item(item)["values"])
     for col in ws.columns:
@@ -585,10 +1153,231 @@ def exportar_xlsx():
     messagebox.showinfo(APP_TITLE, "XLSX exportado ✅")
 
 
+# =========================
+# API HTTP (só leitura)
+# =========================
+
+def _qs_bool(qs, name):
+    return (qs.get(name, [""])[0]).lower() in ("1", "true", "y", "yes", "sim")
+
+def _qs_str(qs, name, default=""):
+    return qs.get(name, [default])[0].strip()
+
+def _qs_float(qs, name):
+    try:
+        return float(_qs_str(qs, name))
+    except ValueError:
+        raise ValueError(f"{name} inválido")
+
+def _ref_de_query(qs, qkey):
+    # Config do watch, com referencia/aparar/iqr_k opcionais na query; ValueError -> 400
+    cfg = watch_config(qkey)
+    ref = _qs_str(qs, "referencia")
+    if ref:
+        ref = REFERENCIAS.get(ref, ref)
+        if not ref_valida("referencia", ref):
+            raise ValueError(f"referencia inválida (usa {', '.join(REFERENCIAS.values())})")
+        cfg["referencia"] = ref
+    if _qs_str(qs, "aparar"):
+        cfg["aparar"] = _qs_float(qs, "aparar")
+        if not ref_valida("aparar", cfg["aparar"]):
+            raise ValueError("aparar deve estar em [0, 0.5)")
+    if _qs_str(qs, "iqr_k"):
+        cfg["iqr_k"] = _qs_float(qs, "iqr_k")
+        if not ref_valida("iqr_k", cfg["iqr_k"]):
+            raise ValueError("iqr_k deve ser um número > 0")
+    return cfg
+
+def _filtros_de_query(qs, anuncios):
+    return {
+        "negociavel": _qs_bool(qs, "negociavel"),
+        "loc": _qs_str(qs, "loc").lower(),
+        "texto": resolver_pesquisa_texto(_qs_str(qs, "texto"), anuncios),
+    }
+
+def _hash_filtros(qs, ref):
+    # Filtros normalizados que determinam a lista paginada; o cursor só vale para eles
+    incluir, excluir = parse_pesquisa_texto(_qs_str(qs, "texto"))
+    chave = [
+        _qs_bool(qs, "negociavel"),
+        _qs_str(qs, "loc").lower(),
+        sorted(incluir),
+        sorted(excluir),
+        _qs_bool(qs, "abaixo_media"),
+        [ref["referencia"], ref["aparar"], ref["iqr_k"]],
+    ]
+    return hashlib.sha1(json.dumps(chave).encode()).hexdigest()[:12]
+
+def _encode_cursor(version, offset, filtros):
+    return base64.urlsafe_b64encode(f"{version}:{offset}:{filtros}".encode()).decode()
+
+def _decode_cursor(cursor):
+    version, offset, filtros = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+    version, offset = int(version), int(offset)
+    if offset < 0:
+        raise ValueError("offset negativo")
+    return version, offset, filtros
+
+def api_watches(qs):
+    _, qkey_actual, _, _ = RESULTS_SNAPSHOT
+    seen_map = load_seen()
+    watches_cfg = load_watches()
+    watches = []
+    for qkey, links in seen_map.items():
+        produto, min_price, max_price = (qkey.split("|") + ["", ""])[:3]
+        watches.append({
+            "query_key": qkey,
+            "produto": produto,
+            "min_price": min_price,
+            "max_price": max_price,
+            "vistos": len(links),
+            "actual": qkey == qkey_actual,
+            "referencia": {**REF_DEFAULT, **watches_cfg.get(qkey, {})},
+        })
+    return 200, {
+        "watches": watches,
+        "pesquisa_actual": LAST_SEARCH_PARAMS,
+        "auto_refresh": AUTO_REFRESH_JOB is not None,
+    }
+
+def api_results(qs):
+    version, qkey, anuncios, _ = RESULTS_SNAPSHOT
+    try:
+        ref = _ref_de_query(qs, qkey)
+    except ValueError as e:
+        return 400, {"erro": str(e)}
+    filtros = _hash_filtros(qs, ref)
+    try:
+        limit = max(1, min(int(_qs_str(qs, "limit", "50")), API_PAGE_LIMIT))
+        cursor = _qs_str(qs, "cursor")
+        offset = 0
+        if cursor:
+            cur_version, offset, cur_filtros = _decode_cursor(cursor)
+            if cur_filtros != filtros:
+                return 400, {"erro": "cursor de outra combinação de filtros"}
+            if cur_version != version:
+                return 410, {"erro": "cursor expirado (novos resultados)"}
+    except (ValueError, UnicodeDecodeError):
+        return 400, {"erro": "limit/cursor inválido"}
+
+    filtrados, _, _ = filtrar_anuncios(anuncios, _filtros_de_query(qs, anuncios), _qs_bool(qs, "abaixo_media"), ref)
+    pagina = filtrados[offset:offset + limit]
+    seguinte = offset + limit
+    return 200, {
+        "query_key": qkey,
+        "total": len(filtrados),
+        "resultados": pagina,
+        "next_cursor": _encode_cursor(version, seguinte, filtros) if seguinte < len(filtrados) else None,
+    }
+
+def api_stats(qs):
+    _, qkey, anuncios, _ = RESULTS_SNAPSHOT
+    try:
+        ref = _ref_de_query(qs, qkey)
+    except ValueError as e:
+        return 400, {"erro": str(e)}
+    filtrados, stats, limiar = filtrar_anuncios(anuncios, _filtros_de_query(qs, anuncios), _qs_bool(qs, "abaixo_media"), ref)
+    return 200, {
+        "query_key": qkey,
+        "anuncios": len(filtrados),
+        "novos": sum(1 for a in filtrados if a.get("novo") == "Y"),
+        **{k: round(v, 2) if v is not None else None for k, v in stats.resumo().items() if k != "count"},
+        "referencia": ref["referencia"],
+        "limiar": round(limiar, 2) if limiar is not None else None,
+    }
+
+def api_search(qs):
+    texto = _qs_str(qs, "q")
+    if not texto:
+        return 400, {"erro": "parâmetro 'q' em falta"}
+    try:
+        limit = max(1, min(int(_qs_str(qs, "limit", "50")), API_PAGE_LIMIT))
+    except ValueError:
+        return 400, {"erro": "limit inválido"}
+    return 200, {"q": texto, "resultados": pesquisar_historico(texto, limit)}
+
+def api_routes(qs):
+    return 200, {"rotas": POOL.metricas()}
+
+def api_history(qs):
+    link = _qs_str(qs, "link")
+    if not link:
+        return 400, {"erro": "parâmetro 'link' em falta"}
+    return 200, {"link": link, "historico": historico_precos(link)}
+
+API_ROUTES = {
+    "/watches": api_watches,
+    "/results": api_results,
+    "/stats": api_stats,
+    "/history": api_history,
+    "/search": api_search,
+    "/routes": api_routes,
+}
+
+def _etag_corresponde(if_none_match, etag):
+    # If-None-Match usa comparação fraca: ignora o prefixo W/
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+class ApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        handler = API_ROUTES.get(url.path.rstrip("/") or "/")
+        if handler is None:
+            status, data = 404, {"erro": "não encontrado", "rotas": sorted(API_ROUTES)}
+        else:
+            try:
+                status, data = handler(parse_qs(url.query))
+            except Exception as e:
+                status, data = 500, {"erro": str(e)}
+
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        gz = "gzip" in self.headers.get("Accept-Encoding", "") and len(body) > 1024
+        # Cada codificação tem o seu ETag forte
+        etag = '"' + hashlib.sha1(body).hexdigest() + ('-gz"' if gz else '"')
+        if status == 200 and _etag_corresponde(self.headers.get("If-None-Match", ""), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        if gz:
+            body = gzip.compress(body)
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if gz:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def iniciar_api():
+    try:
+        server = ThreadingHTTPServer((API_HOST, API_PORT), ApiHandler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
 # =========================
 # UI (moderna)
 # =========================
 
+HAS_FTS5 = init_index()
+
 root = tk.Tk()
 root.title(APP_TITLE)
 root.geometry("1280x820")
@@ -662,16 +1451,25 @@ filters.pack(fill=tk.X, padx=14, pady=(0, 6))
 var_alertas = tk.BooleanVar(value=True)
 var_negociavel = tk.BooleanVar(value=False)
 var_abaixo_media = tk.BooleanVar(value=False)
+var_referencia = tk.StringVar(value="Mediana")
 
 ttk.Checkbutton(filters, text="Alertas", variable=var_alertas).pack(side=tk.LEFT, padx=(0, 10))
 ttk.Checkbutton(filters, text="Só negociáveis", variable=var_negociavel, command=on_filters_changed).pack(side=tk.LEFT, padx=(0, 10))
-ttk.Checkbutton(filters, text="Só abaixo da média", variable=var_abaixo_media, command=on_filters_changed).pack(side=tk.LEFT, padx=(0, 14))
+ttk.Checkbutton(filters, text="Só abaixo da", variable=var_abaixo_media, command=on_filters_changed).pack(side=tk.LEFT)
+cmb_referencia = ttk.Combobox(filters, textvariable=var_referencia, values=list(REFERENCIAS.keys()), width=14, state="readonly")
+cmb_referencia.pack(side=tk.LEFT, padx=(0, 14))
+cmb_referencia.bind("<<ComboboxSelected>>", on_referencia_changed)
 
 ttk.Label(filters, text="Localização contém").pack(side=tk.LEFT)
 entry_loc = ttk.Entry(filters, width=26)
 entry_loc.pack(side=tk.LEFT, padx=(10, 0))
 entry_loc.bind("<KeyRelease>", lambda e: on_filters_changed())
 
+ttk.Label(filters, text="Texto").pack(side=tk.LEFT, padx=(14, 0))
+entry_texto = ttk.Entry(filters, width=30)
+entry_texto.pack(side=tk.LEFT, padx=(10, 0))
+entry_texto.bind("<KeyRelease>", lambda e: on_filters_changed())
+
 # Stats
 lbl_stats = ttk.Label(root, text="")
 lbl_stats.pack(anchor=tk.W, padx=14)
@@ -750,5 +1548,10 @@ ttk.Label(statusbar, textvariable=status_var).pack(side=tk.LEFT, padx=12)
 refresh_favorites_tab()
 atualizar_setas_cabecalho_resultados()
 atualizar_setas_cabecalho_favs()
+root.after(300, oferecer_retomar_scan)
+
+api_server = iniciar_api()
+if api_server:
+    status_var.set(f"Pronto. • API: http://{API_HOST}:{API_PORT}")
 
 root.mainloop()
\ No newline at end of file